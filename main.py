@@ -2,45 +2,38 @@ import math
 import random
 import sys
 from dataclasses import dataclass
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 
+import numpy as np
 import pygame
+import pygame.gfxdraw
+
+try:
+    from physics_numba import get_num_threads, resolve_edges, resolve_pairs, step_integrate, wake_slow
+except ImportError:
+    # Sin Numba: los mismos kernels en Cython (physics.pyx), compilados al importar
+    import pyximport
+    pyximport.install(language_level=3)
+    from physics import get_num_threads, resolve_edges, resolve_pairs, step_integrate, wake_slow
+
+try:
+    # Render de pelotas en GPU (opcional)
+    import moderngl
+    from render_gl import GLRenderer
+except ImportError:
+    moderngl = None
+
+# Precisión de los arrays de física (SoA); el render convierte a int igualmente
+REAL = np.float32
 
 # -----------------------------
 # Utilidades de vectores (2D)
 # -----------------------------
 
-def dot(a: Tuple[float, float], b: Tuple[float, float]) -> float:
-    return a[0] * b[0] + a[1] * b[1]
-
-
-def sub(a: Tuple[float, float], b: Tuple[float, float]) -> Tuple[float, float]:
-    return (a[0] - b[0], a[1] - b[1])
-
-
 def add(a: Tuple[float, float], b: Tuple[float, float]) -> Tuple[float, float]:
     return (a[0] + b[0], a[1] + b[1])
 
 
-def mul(a: Tuple[float, float], s: float) -> Tuple[float, float]:
-    return (a[0] * s, a[1] * s)
-
-
-def length(v: Tuple[float, float]) -> float:
-    return math.hypot(v[0], v[1])
-
-
-def normalize(v: Tuple[float, float]) -> Tuple[float, float]:
-    l = length(v)
-    if l <= 1e-8:
-        return (0.0, 0.0)
-    return (v[0] / l, v[1] / l)
-
-
-def clamp(x: float, lo: float, hi: float) -> float:
-    return max(lo, min(hi, x))
-
-
 # -----------------------------
 # Geometría del hexágono
 # -----------------------------
@@ -56,53 +49,75 @@ def regular_polygon(center: Tuple[int, int], radius: float, sides: int, start_an
     return verts
 
 
-@dataclass
-class Edge:
-    p1: Tuple[float, float]
-    p2: Tuple[float, float]
-    t: Tuple[float, float]
-    n: Tuple[float, float]
-    length: float
+# Hexágono unitario (start_angle -90°): cos/sin de múltiplos de 60° son constantes
+_SQRT3_2 = math.sqrt(3.0) / 2.0
+_HEX_UNIT = ((0.0, -1.0), (_SQRT3_2, -0.5), (_SQRT3_2, 0.5),
+             (0.0, 1.0), (-_SQRT3_2, 0.5), (-_SQRT3_2, -0.5))
+
+
+def hex_verts(cx: float, cy: float, radius: float) -> List[Tuple[float, float]]:
+    # Igual que regular_polygon((cx, cy), radius, 6) pero sin trigonometría
+    return [(cx + radius * ux, cy + radius * uy) for ux, uy in _HEX_UNIT]
 
 
-def build_edges(verts_ccw: List[Tuple[float, float]]) -> List[Edge]:
-    edges: List[Edge] = []
+@dataclass
+class Edges:
+    # Aristas en columnas planas (SoA), una entrada por arista
+    p1x: np.ndarray
+    p1y: np.ndarray
+    tx: np.ndarray
+    ty: np.ndarray
+    nx: np.ndarray
+    ny: np.ndarray
+    length: np.ndarray
+
+    def translated(self, dx: float, dy: float) -> "Edges":
+        # Tangentes, normales y longitudes no cambian al trasladar
+        return Edges(self.p1x + dx, self.p1y + dy, self.tx, self.ty, self.nx, self.ny, self.length)
+
+
+def build_edges(verts_ccw: List[Tuple[float, float]]) -> Edges:
+    p1x, p1y, tx, ty, lengths = [], [], [], [], []
     n = len(verts_ccw)
     for i in range(n):
         p1 = verts_ccw[i]
         p2 = verts_ccw[(i + 1) % n]
-        e = sub(p2, p1)
-        L = length(e)
+        ex = p2[0] - p1[0]
+        ey = p2[1] - p1[1]
+        L = math.sqrt(ex * ex + ey * ey)
         if L < 1e-8:
             continue
-        t = (e[0] / L, e[1] / L)
-        inward = (-t[1], t[0])  # normal hacia adentro para CCW
-        edges.append(Edge(p1, p2, t, inward, L))
-    return edges
+        p1x.append(p1[0])
+        p1y.append(p1[1])
+        tx.append(ex / L)
+        ty.append(ey / L)
+        lengths.append(L)
+    tx_arr = np.array(tx, dtype=REAL)
+    ty_arr = np.array(ty, dtype=REAL)
+    # normal hacia adentro para CCW: (-ty, tx)
+    return Edges(np.array(p1x, dtype=REAL), np.array(p1y, dtype=REAL),
+                 tx_arr, ty_arr, -ty_arr, tx_arr.copy(), np.array(lengths, dtype=REAL))
 
 
 # -----------------------------
-# Pelota y simulación
+# Simulación (pelotas en SoA)
 # -----------------------------
 
-@dataclass
-class Ball:
-    pos: Tuple[float, float]
-    vel: Tuple[float, float]
-    radius: float
-    color: Tuple[int, int, int]
-
-
 class World:
-    def __init__(self, width: int, height: int):
+    def __init__(self, width: int, height: int, dt: float = 1.0 / 240.0):
         self.width = width
         self.height = height
+        # Paso de tiempo fijo: la física no depende del framerate
+        self.dt = dt
 
         # Hexágono centrado
         self.center = (width // 2, height // 2)
         self.hex_radius = min(width, height) * 0.38
-        self.verts = regular_polygon(self.center, self.hex_radius, 6)
-        self.edges = build_edges(self.verts)
+        # Geometría en reposo: se calcula una vez y se reutiliza mientras no haya shake.
+        # El shake sólo traslada el hexágono: tangentes, normales y longitudes no cambian.
+        self._rest_verts = hex_verts(self.center[0], self.center[1], self.hex_radius)
+        self._rest_edges = build_edges(self._rest_verts)
+        self._set_geometry(self._rest_verts, self._rest_edges)
 
         # Física global
         self.gravity = (0.0, 150.0) # Gravedad lunar (1/6 aprox)
@@ -121,181 +136,130 @@ class World:
         self.shake_d = 8.0   # amortiguamiento
         self.shake_impulse = 500.0  # velocidad inicial por burst (px/s)
 
-        # Pelotas
-        self.balls: List[Ball] = []
+        # Pelotas: estado en arrays (SoA) pos[N,2], vel[N,2], radius[N]
+        self.pos = np.zeros((0, 2), dtype=REAL)
+        self.vel = np.zeros((0, 2), dtype=REAL)
+        self.radius = np.zeros(0, dtype=REAL)
+        self.colors: List[Tuple[int, int, int]] = []
         self._spawn_balls(10)
 
-    def step(self, dt: float):
+        # Tabla de direcciones unitarias para separar pelotas con centros
+        # coincidentes (en lugar de llamar a random dentro del kernel)
+        jitter = np.random.default_rng(0).normal(size=(256, 2))
+        self._jitter_dirs = (jitter / np.hypot(jitter[:, 0], jitter[:, 1])[:, None]).astype(REAL)
+        self._jitter_idx = 0
+
+    def _set_geometry(self, verts: List[Tuple[float, float]], edges: Edges):
+        self.verts = verts
+        self.edges = edges
+
+    def step(self):
+        dt = self.dt
         # Actualizar shake y geometría
         self._update_shake(dt)
 
         # Aceleración efectiva (inercial): g - a_contenedor
-        effective_g = add(self.gravity, mul(self.shake_acc, -1.0))
-
-        # Integración simple
-        for b in self.balls:
-            b.vel = add(b.vel, mul(effective_g, dt))
-            if self.damping_global > 0:
-                b.vel = mul(b.vel, max(0.0, 1.0 - self.damping_global * dt))
-            b.pos = add(b.pos, mul(b.vel, dt))
+        gx, gy = self.gravity
+        ax, ay = self.shake_acc
+        damp = max(0.0, 1.0 - self.damping_global * dt)
+        step_integrate(self.pos, self.vel, (gx - ax) * dt, (gy - ay) * dt, damp, dt)
 
         # Colisión pared-bola (pared moviéndose con velocidad de shake)
-        wall_v = self.shake_vel
-        for b in self.balls:
-            for e in self.edges:
-                self._resolve_edge_collision(b, e, wall_v)
-            self._snap_inside(b)
+        wvx, wvy = self.shake_vel
+        e = self.edges
+        resolve_edges(self.pos, self.vel, self.radius,
+                      e.p1x, e.p1y, e.tx, e.ty, e.nx, e.ny, e.length,
+                      wvx, wvy, self.restitucion_pared, self.friccion_tangencial)
 
         # Colisiones entre bolas
-        n = len(self.balls)
-        for i in range(n):
-            for j in range(i + 1, n):
-                self._resolve_ball_collision(self.balls[i], self.balls[j])
-
-        # Evitar dormir totalmente
-        for b in self.balls:
-            if length(b.vel) < 12.0:
-                b.vel = add(b.vel, mul(normalize(sub(self.center, b.pos)), 16.0))
-
-    def _resolve_edge_collision(self, ball: Ball, edge: Edge, wall_vel: Tuple[float, float]):
-        c = ball.pos
-        r = ball.radius
-
-        to_c = sub(c, edge.p1)
-        s = dot(edge.n, to_c)
-
-        u = clamp(dot(to_c, edge.t), 0.0, edge.length)
-        q = add(edge.p1, mul(edge.t, u))
-        cq = sub(c, q)
-        dist = length(cq)
-
-        hits_side = (0.0 < u < edge.length) and (s < r)
-        hits_vertex = (u == 0.0 or u == edge.length) and (dist < r)
-        if not (hits_side or hits_vertex):
-            return
+        resolve_pairs(self.pos, self.vel, self.radius, self.restitucion_bolas,
+                      self._jitter_dirs, self._jitter_idx, get_num_threads())
+        self._jitter_idx += 1
 
-        if hits_side:
-            n = edge.n
-            penetration = r - s
-        else:
-            vtx = edge.p1 if u == 0.0 else edge.p2
-            n = normalize(sub(c, vtx))
-            if n == (0.0, 0.0):
-                n = edge.n
-            penetration = r - length(sub(c, vtx))
-
-        v_wall_n = dot(wall_vel, n)
-        vn = dot(ball.vel, n)
-        vn_rel = vn - v_wall_n
-        if vn_rel < 0.0:
-            vt = sub(ball.vel, mul(n, vn))
-            new_vn_rel = -self.restitucion_pared * vn_rel
-            new_vn = new_vn_rel + v_wall_n
-            vt = mul(vt, max(0.0, 1.0 - self.friccion_tangencial))
-            ball.vel = add(mul(n, new_vn), vt)
-
-        k_slop = 0.001
-        ball.pos = add(ball.pos, mul(n, max(0.0, penetration + k_slop)))
-
-    def _snap_inside(self, ball: Ball):
-        for e in self.edges:
-            s = dot(e.n, sub(ball.pos, e.p1))
-            if s < 0.0:
-                ball.pos = add(ball.pos, mul(e.n, -s + 0.1))
-
-    def _resolve_ball_collision(self, a: Ball, b: Ball):
-        n = sub(b.pos, a.pos)
-        dist = length(n)
-        rsum = a.radius + b.radius
-        if dist <= 1e-8:
-            ang = random.uniform(0, 2*math.pi)
-            n = (math.cos(ang), math.sin(ang))
-            dist = 1.0
-        else:
-            n = (n[0]/dist, n[1]/dist)
-
-        overlap = rsum - dist
-        if overlap <= 0:
-            return
+        wake_slow(self.pos, self.vel, float(self.center[0]), float(self.center[1]))
 
-        ma = max(1.0, a.radius * a.radius)
-        mb = max(1.0, b.radius * b.radius)
-        inv_ma = 1.0/ma
-        inv_mb = 1.0/mb
-        total_inv = inv_ma + inv_mb
-        corr = mul(n, overlap / total_inv)
-        a.pos = sub(a.pos, mul(corr, inv_ma))
-        b.pos = add(b.pos, mul(corr, inv_mb))
-
-        rv = sub(b.vel, a.vel)
-        vel_n = dot(rv, n)
-        if vel_n > 0:
-            return
-        e = self.restitucion_bolas
-        j = -(1 + e) * vel_n / (inv_ma + inv_mb)
-        imp = mul(n, j)
-        a.vel = sub(a.vel, mul(imp, inv_ma))
-        b.vel = add(b.vel, mul(imp, inv_mb))
-
-    def _spawn_balls(self, n: int):
+    def _spawn_balls(self, n: int, max_attempts: int = 5000):
         colors = [
             (240, 80, 80), (80, 200, 120), (80, 160, 240), (230, 180, 70),
             (200, 100, 220), (60, 220, 200), (240, 120, 160), (150, 150, 255), (255, 140, 90)
         ]
-        attempts = 0
-        while len(self.balls) < n and attempts < 5000:
-            attempts += 1
-            rad = random.uniform(9.0, 16.0)
-            ang = random.uniform(0, 2*math.pi)
-            rr = random.uniform(0.0, self.hex_radius - rad)
-            p = add(self.center, (rr*math.cos(ang), rr*math.sin(ang)))
-            ok = True
-            for e in self.edges:
-                if dot(e.n, sub(p, e.p1)) < rad + 2.0:
-                    ok = False
-                    break
-            if not ok:
-                continue
-            for b in self.balls:
-                if length(sub(p, b.pos)) < rad + b.radius + 2.0:
-                    ok = False
-                    break
-            if not ok:
+        n_old = len(self.radius)
+        if n_old >= n:
+            return
+        # Todos los candidatos de una vez: radio, posición polar y velocidad
+        rng = np.random.default_rng()
+        rads = rng.uniform(9.0, 16.0, max_attempts)
+        angs = rng.uniform(0.0, 2*math.pi, max_attempts)
+        rrs = rng.uniform(0.0, 1.0, max_attempts) * (self.hex_radius - rads)
+        cand = np.empty((max_attempts, 2))
+        cand[:, 0] = self.center[0] + rrs * np.cos(angs)
+        cand[:, 1] = self.center[1] + rrs * np.sin(angs)
+        vels = np.column_stack((rng.uniform(-120, 120, max_attempts), rng.uniform(-60, 0, max_attempts)))
+        color_idx = rng.integers(len(colors), size=max_attempts)
+
+        # Distancia con signo de cada candidato a cada arista: [attempts, E]
+        e = self.edges
+        s = cand[:, 0:1] * e.nx + cand[:, 1:2] * e.ny - (e.nx * e.p1x + e.ny * e.p1y)
+        inside = s.min(axis=1) >= rads + 2.0
+
+        pos = np.zeros((n, 2))
+        radius = np.zeros(n)
+        pos[:n_old] = self.pos
+        radius[:n_old] = self.radius
+        picked = []
+        count = n_old
+        for k in np.flatnonzero(inside):
+            # Solape contra las pelotas ya aceptadas (vectorizado)
+            d = pos[:count] - cand[k]
+            min_d = radius[:count] + rads[k] + 2.0
+            if np.any(d[:, 0] * d[:, 0] + d[:, 1] * d[:, 1] < min_d * min_d):
                 continue
-            v = (random.uniform(-120, 120), random.uniform(-60, 0))
-            color = random.choice(colors)
-            self.balls.append(Ball(p, v, rad, color))
+            pos[count] = cand[k]
+            radius[count] = rads[k]
+            picked.append(k)
+            count += 1
+            if count == n:
+                break
+
+        self.pos = pos[:count].astype(REAL)
+        self.vel = np.concatenate((self.vel, vels[picked])).astype(REAL)
+        self.radius = radius[:count].astype(REAL)
+        self.colors.extend(colors[i] for i in color_idx[picked])
 
     def _update_shake(self, dt: float):
         # Dinámica: offset'' = -k*offset - d*offset'
-        # Integración explícita simple
-        if not self.shake_active and length(self.shake_vel) < 1e-4 and length(self.shake_offset) < 1e-4:
+        # Integración explícita simple (en escalares; se guarda una tupla al final)
+        ox, oy = self.shake_offset
+        vx, vy = self.shake_vel
+        if not self.shake_active and vx * vx + vy * vy < 1e-8 and ox * ox + oy * oy < 1e-8:
             # En reposo en el centro
             self.shake_offset = (0.0, 0.0)
             self.shake_vel = (0.0, 0.0)
             self.shake_acc = (0.0, 0.0)
-            self.verts = regular_polygon(self.center, self.hex_radius, 6)
-            self.edges = build_edges(self.verts)
+            self._set_geometry(self._rest_verts, self._rest_edges)
             return
 
         # a = -k*x - d*v
-        ax = -self.shake_k * self.shake_offset[0] - self.shake_d * self.shake_vel[0]
-        ay = -self.shake_k * self.shake_offset[1] - self.shake_d * self.shake_vel[1]
-        self.shake_acc = (ax, ay)
-        self.shake_vel = (self.shake_vel[0] + ax * dt, self.shake_vel[1] + ay * dt)
-        self.shake_offset = (self.shake_offset[0] + self.shake_vel[0] * dt,
-                              self.shake_offset[1] + self.shake_vel[1] * dt)
+        ax = -self.shake_k * ox - self.shake_d * vx
+        ay = -self.shake_k * oy - self.shake_d * vy
+        vx += ax * dt
+        vy += ay * dt
+        ox += vx * dt
+        oy += vy * dt
 
         # Umbral para parar
-        if length(self.shake_vel) < 1e-2 and length(self.shake_offset) < 1e-2:
+        if vx * vx + vy * vy < 1e-4 and ox * ox + oy * oy < 1e-4:
             self.shake_active = False
-            self.shake_offset = (0.0, 0.0)
-            self.shake_vel = (0.0, 0.0)
-            self.shake_acc = (0.0, 0.0)
+            ox = oy = vx = vy = ax = ay = 0.0
+        self.shake_acc = (ax, ay)
+        self.shake_vel = (vx, vy)
+        self.shake_offset = (ox, oy)
 
-        moved_center = add(self.center, self.shake_offset)
-        self.verts = regular_polygon(moved_center, self.hex_radius, 6)
-        self.edges = build_edges(self.verts)
+        # El hexágono sólo se traslada: mover vértices y extremos de las aristas
+        cx = self.center[0] + ox
+        cy = self.center[1] + oy
+        verts = hex_verts(cx, cy, self.hex_radius)
+        self._set_geometry(verts, self._rest_edges.translated(ox, oy))
 
     def shake_burst(self, magnitude: float = 1.0):
         # Aplica un impulso de velocidad al contenedor en dirección aleatoria
@@ -313,24 +277,48 @@ COLOR_BG = (15, 16, 20)
 COLOR_HEX = (80, 160, 220)
 COLOR_HEX_FILL = (25, 30, 40)
 
+# Sprites de pelota pre-renderizados por (color, radio)
+_ball_sprites: Dict[Tuple[Tuple[int, int, int], int], pygame.Surface] = {}
 
-def draw_world(screen: pygame.Surface, world: World):
+
+def _ball_sprite(color: Tuple[int, int, int], r: int) -> pygame.Surface:
+    surf = _ball_sprites.get((color, r))
+    if surf is None:
+        surf = pygame.Surface((2 * r + 1, 2 * r + 1), pygame.SRCALPHA)
+        pygame.gfxdraw.filled_circle(surf, r, r, r, color)
+        pygame.gfxdraw.aacircle(surf, r, r, r, color)
+        _ball_sprites[(color, r)] = surf
+    return surf
+
+
+def draw_hexagon(screen: pygame.Surface, world: World):
     pygame.draw.polygon(screen, COLOR_HEX_FILL, world.verts)
     pygame.draw.polygon(screen, COLOR_HEX, world.verts, width=3)
-    for b in world.balls:
-        pygame.draw.circle(screen, b.color, (int(b.pos[0]), int(b.pos[1])), int(b.radius))
+
+
+def draw_world(screen: pygame.Surface, world: World):
+    draw_hexagon(screen, world)
+    # Conversión a enteros de una vez para todas las pelotas y un único blits()
+    radii = world.radius.astype(np.int64)
+    corners = (world.pos.astype(np.int64) - radii[:, None]).tolist()
+    sprites = [_ball_sprite(color, r) for color, r in zip(world.colors, radii.tolist())]
+    screen.blits(list(zip(sprites, corners)), doreturn=False)
 
 
 def run():
     pygame.init()
     pygame.display.set_caption("Pelotas con gravedad + shake en hexágono")
     W, H = 900, 900
-    screen = pygame.display.set_mode((W, H))
+    screen, renderer = _open_display(W, H)
     clock = pygame.time.Clock()
     world = World(W, H)
 
+    # Paso fijo con acumulador: se hacen tantos sub-pasos como quepan en el
+    # tiempo real transcurrido (limitados para no entrar en espiral si un
+    # frame se retrasa mucho)
+    max_substeps = 8
+    accumulator = 0.0
     running = True
-    fixed_dt = None
     while running:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -341,24 +329,54 @@ def run():
                 elif event.key == pygame.K_SPACE:
                     world.shake_burst(1.0)
 
-        if fixed_dt is not None:
-            dt = fixed_dt
-            clock.tick(int(1.0/dt))
+        accumulator += clock.tick(120) / 1000.0
+        substeps = 0
+        while accumulator >= world.dt and substeps < max_substeps:
+            world.step()
+            accumulator -= world.dt
+            substeps += 1
+        if substeps == max_substeps:
+            accumulator = 0.0
+
+        if renderer is not None:
+            # Fondo, hexágono y texto con pygame en el overlay (sólo si el
+            # hexágono se ha movido); pelotas en GPU
+            if renderer.overlay_dirty(world):
+                renderer.overlay.fill(COLOR_BG)
+                draw_hexagon(renderer.overlay, world)
+                _draw_hint(renderer.overlay)
+            renderer.draw(world)
         else:
-            dt_ms = clock.tick(120)
-            dt = dt_ms/1000.0
-
-        world.step(dt)
-
-        screen.fill(COLOR_BG)
-        draw_world(screen, world)
-        _draw_hint(screen)
+            screen.fill(COLOR_BG)
+            draw_world(screen, world)
+            _draw_hint(screen)
         pygame.display.flip()
 
     pygame.quit()
     return 0
 
 
+def _open_display(W: int, H: int):
+    # Con moderngl se usa una ventana OpenGL; si no hay contexto disponible,
+    # se vuelve al render por software
+    if moderngl is not None:
+        # Los shaders piden GLSL 330: sin esto SDL puede dar un contexto
+        # legacy 2.1 (siempre en macOS)
+        pygame.display.gl_set_attribute(pygame.GL_CONTEXT_MAJOR_VERSION, 3)
+        pygame.display.gl_set_attribute(pygame.GL_CONTEXT_MINOR_VERSION, 3)
+        pygame.display.gl_set_attribute(pygame.GL_CONTEXT_PROFILE_MASK, pygame.GL_CONTEXT_PROFILE_CORE)
+        if sys.platform == "darwin":
+            pygame.display.gl_set_attribute(pygame.GL_CONTEXT_FLAGS, pygame.GL_CONTEXT_FORWARD_COMPATIBLE_FLAG)
+        try:
+            pygame.display.set_mode((W, H), pygame.OPENGL | pygame.DOUBLEBUF)
+            return None, GLRenderer(W, H)
+        except Exception:
+            # moderngl lanza ValueError si la versión es < 3.3 y glcontext un
+            # Exception genérico si no detecta contexto
+            pass
+    return pygame.display.set_mode((W, H)), None
+
+
 def _draw_hint(screen: pygame.Surface):
     font = pygame.font.SysFont("consolas,arial", 16)
     hint = "SPACE: shake | ESC: salir"
@@ -0,0 +1,257 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True, initializedcheck=False
+# Kernels de física en Cython: misma interfaz que physics_numba.py, para
+# entornos sin Numba. pyximport lo compila al importar (ver physics.pyxbld).
+# Los bucles internos corren sin GIL, listos para cython.parallel.prange.
+
+import numpy as np
+
+from libc.math cimport sqrtf
+
+# Interfaz común de los dos backends (main.py importa exactamente esto)
+__all__ = ["get_num_threads", "step_integrate", "resolve_edges", "resolve_pairs", "wake_slow"]
+
+cdef float _K_SLOP = 0.01  # margen de corrección ampliado para absorber el redondeo de float32
+cdef float _SNAP_MARGIN = 0.1
+cdef float _WAKE_SPEED_SQ = 12.0 * 12.0
+cdef float _WAKE_PUSH = 16.0
+
+# Mezcla del índice de par para elegir dirección de jitter sin contador compartido
+cdef Py_ssize_t _JITTER_MIX = 97
+
+# Celda propia + 4 vecinas "hacia delante": cada par de celdas se visita una vez
+cdef Py_ssize_t[5] _FORWARD_DX = [0, 1, 1, 1, 0]
+cdef Py_ssize_t[5] _FORWARD_DY = [0, -1, 0, 1, 1]
+
+
+def get_num_threads():
+    # Todavía sin prange: un único hilo
+    return 1
+
+
+cpdef void step_integrate(float[:, ::1] pos, float[:, ::1] vel,
+                          float gdx, float gdy, float damp, float dt):
+    # gd = g_efectiva*dt y damp ya vienen precalculados para el paso fijo
+    cdef Py_ssize_t i
+    cdef float vx, vy
+    with nogil:
+        for i in range(pos.shape[0]):
+            vx = (vel[i, 0] + gdx) * damp
+            vy = (vel[i, 1] + gdy) * damp
+            vel[i, 0] = vx
+            vel[i, 1] = vy
+            pos[i, 0] += vx * dt
+            pos[i, 1] += vy * dt
+
+
+cpdef void resolve_edges(float[:, ::1] pos, float[:, ::1] vel, float[::1] radii,
+                         float[::1] p1x, float[::1] p1y, float[::1] etx, float[::1] ety,
+                         float[::1] enx, float[::1] eny, float[::1] elen,
+                         float wvx, float wvy, float rest, float fric):
+    # Colisión pared-bola (pared moviéndose con velocidad wv) + snap inside.
+    # Invariantes de la llamada fuera de los bucles; el estado de cada pelota
+    # vive en locales y se escribe una sola vez al final.
+    cdef Py_ssize_t i, k
+    cdef Py_ssize_t n_edges = elen.shape[0]
+    cdef bint dirty
+    cdef float keep_t = max(<float>0.0, 1 - fric)
+    cdef float r, r_sq, cx, cy, vx, vy, ax, ay, tx, ty, nx, ny, L
+    cdef float dx, dy, s, u, cqx, cqy, dist_sq, dist
+    cdef float penetration, v_wall_n, vn, vn_rel, new_vn, push
+    with nogil:
+        for i in range(pos.shape[0]):
+            r = radii[i]
+            r_sq = r * r
+            cx = pos[i, 0]
+            cy = pos[i, 1]
+            vx = vel[i, 0]
+            vy = vel[i, 1]
+            # El snap sólo hace falta si alguna arista movió la pelota o si el
+            # centro ya estaba fuera de alguna
+            dirty = False
+            for k in range(n_edges):
+                ax = p1x[k]
+                ay = p1y[k]
+                tx = etx[k]
+                ty = ety[k]
+                nx = enx[k]
+                ny = eny[k]
+                L = elen[k]
+                dx = cx - ax
+                dy = cy - ay
+                s = nx * dx + ny * dy
+                if s < 0.0:
+                    dirty = True
+                u = tx * dx + ty * dy
+                if u < 0.0:
+                    u = 0.0
+                elif u > L:
+                    u = L
+                if 0.0 < u < L:
+                    if s >= r:
+                        continue
+                    penetration = r - s
+                else:
+                    cqx = cx - (ax + tx * u)
+                    cqy = cy - (ay + ty * u)
+                    dist_sq = cqx * cqx + cqy * cqy
+                    if dist_sq >= r_sq:
+                        continue
+                    dist = sqrtf(dist_sq)
+                    if dist > 1e-8:
+                        nx = cqx / dist
+                        ny = cqy / dist
+                    penetration = r - dist
+
+                v_wall_n = wvx * nx + wvy * ny
+                vn = vx * nx + vy * ny
+                vn_rel = vn - v_wall_n
+                if vn_rel < 0.0:
+                    new_vn = -rest * vn_rel + v_wall_n
+                    vx = nx * new_vn + (vx - nx * vn) * keep_t
+                    vy = ny * new_vn + (vy - ny * vn) * keep_t
+
+                push = max(<float>0.0, penetration + _K_SLOP)
+                cx += nx * push
+                cy += ny * push
+                dirty = True
+
+            if dirty:
+                for k in range(n_edges):
+                    nx = enx[k]
+                    ny = eny[k]
+                    s = nx * (cx - p1x[k]) + ny * (cy - p1y[k])
+                    if s < 0.0:
+                        cx += nx * (_SNAP_MARGIN - s)
+                        cy += ny * (_SNAP_MARGIN - s)
+            pos[i, 0] = cx
+            pos[i, 1] = cy
+            vel[i, 0] = vx
+            vel[i, 1] = vy
+
+
+cdef inline void _collide_pair(float[:, ::1] pos, float[:, ::1] vel, float[::1] radii, float rest,
+                               float[:, ::1] jitter, Py_ssize_t jitter_idx, Py_ssize_t i, Py_ssize_t j,
+                               float[:, ::1] dpos, float[:, ::1] dvel) noexcept nogil:
+    cdef Py_ssize_t d
+    cdef float nx, ny, dist_sq, dist, rsum, overlap, inv_ma, inv_mb, total_inv, corr, vel_n, jn
+    nx = pos[j, 0] - pos[i, 0]
+    ny = pos[j, 1] - pos[i, 1]
+    dist_sq = nx * nx + ny * ny
+    rsum = radii[i] + radii[j]
+    if dist_sq >= rsum * rsum:
+        return
+    if dist_sq <= 1e-16:
+        # Centros coincidentes: dirección de la tabla de jitter (tamaño 2^k)
+        d = (jitter_idx + i * _JITTER_MIX + j) & (jitter.shape[0] - 1)
+        nx = jitter[d, 0]
+        ny = jitter[d, 1]
+        dist = 1.0
+    else:
+        dist = sqrtf(dist_sq)
+        nx /= dist
+        ny /= dist
+
+    overlap = rsum - dist
+    if overlap <= 0.0:
+        return
+
+    inv_ma = 1 / max(<float>1.0, radii[i] * radii[i])
+    inv_mb = 1 / max(<float>1.0, radii[j] * radii[j])
+    total_inv = inv_ma + inv_mb
+    corr = overlap / total_inv
+    dpos[i, 0] -= nx * corr * inv_ma
+    dpos[i, 1] -= ny * corr * inv_ma
+    dpos[j, 0] += nx * corr * inv_mb
+    dpos[j, 1] += ny * corr * inv_mb
+
+    vel_n = (vel[j, 0] - vel[i, 0]) * nx + (vel[j, 1] - vel[i, 1]) * ny
+    if vel_n > 0.0:
+        return
+    jn = -(1 + rest) * vel_n / total_inv
+    dvel[i, 0] -= nx * jn * inv_ma
+    dvel[i, 1] -= ny * jn * inv_ma
+    dvel[j, 0] += nx * jn * inv_mb
+    dvel[j, 1] += ny * jn * inv_mb
+
+
+cpdef void resolve_pairs(float[:, ::1] pos, float[:, ::1] vel, float[::1] radii, float rest,
+                         float[:, ::1] jitter, Py_ssize_t jitter_idx, Py_ssize_t n_threads):
+    # Fase amplia con rejilla de celda 2*r_max (counting sort: las pelotas de
+    # la celda c son order[start[c]:start[c + 1]]). Correcciones e impulsos
+    # se acumulan en dpos/dvel y se suman al final, igual que en Numba.
+    cdef Py_ssize_t N = pos.shape[0]
+    if N < 2:
+        return
+    cdef Py_ssize_t i, j, f, c, s, cx, cy, cid, gw = 1, gh = 1
+    cdef float cell, xmin, ymin, rmax
+    cdef Py_ssize_t[::1] cell_x = np.empty(N, dtype=np.intp)
+    cdef Py_ssize_t[::1] cell_y = np.empty(N, dtype=np.intp)
+    cdef float[:, ::1] dpos = np.zeros((N, 2), dtype=np.float32)
+    cdef float[:, ::1] dvel = np.zeros((N, 2), dtype=np.float32)
+    cdef Py_ssize_t[::1] start, fill, order
+
+    with nogil:
+        xmin = pos[0, 0]
+        ymin = pos[0, 1]
+        rmax = radii[0]
+        for i in range(1, N):
+            xmin = min(xmin, pos[i, 0])
+            ymin = min(ymin, pos[i, 1])
+            rmax = max(rmax, radii[i])
+        cell = 2 * rmax
+        for i in range(N):
+            cell_x[i] = <Py_ssize_t>((pos[i, 0] - xmin) / cell)
+            cell_y[i] = <Py_ssize_t>((pos[i, 1] - ymin) / cell)
+            gw = max(gw, cell_x[i] + 1)
+            gh = max(gh, cell_y[i] + 1)
+
+    start = np.zeros(gw * gh + 1, dtype=np.intp)
+    order = np.empty(N, dtype=np.intp)
+    with nogil:
+        for i in range(N):
+            start[cell_y[i] * gw + cell_x[i] + 1] += 1
+        for c in range(gw * gh):
+            start[c + 1] += start[c]
+    fill = np.array(start[:gw * gh])
+    with nogil:
+        for i in range(N):
+            c = cell_y[i] * gw + cell_x[i]
+            order[fill[c]] = i
+            fill[c] += 1
+
+        for i in range(N):
+            for f in range(5):
+                cx = cell_x[i] + _FORWARD_DX[f]
+                cy = cell_y[i] + _FORWARD_DY[f]
+                if cx >= gw or cy < 0 or cy >= gh:
+                    continue
+                cid = cy * gw + cx
+                for s in range(start[cid], start[cid + 1]):
+                    j = order[s]
+                    if f == 0 and j <= i:
+                        continue
+                    _collide_pair(pos, vel, radii, rest, jitter, jitter_idx, i, j, dpos, dvel)
+
+        for i in range(N):
+            pos[i, 0] += dpos[i, 0]
+            pos[i, 1] += dpos[i, 1]
+            vel[i, 0] += dvel[i, 0]
+            vel[i, 1] += dvel[i, 1]
+
+
+cpdef void wake_slow(float[:, ::1] pos, float[:, ::1] vel, float cx, float cy):
+    # Evitar dormir totalmente: empujón hacia el centro a las pelotas lentas
+    cdef Py_ssize_t i
+    cdef float vx, vy, dx, dy, d_sq, k
+    with nogil:
+        for i in range(pos.shape[0]):
+            vx = vel[i, 0]
+            vy = vel[i, 1]
+            if vx * vx + vy * vy < _WAKE_SPEED_SQ:
+                dx = cx - pos[i, 0]
+                dy = cy - pos[i, 1]
+                d_sq = dx * dx + dy * dy
+                if d_sq > 1e-16:
+                    k = _WAKE_PUSH / sqrtf(d_sq)
+                    vel[i, 0] += dx * k
+                    vel[i, 1] += dy * k
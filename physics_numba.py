@@ -0,0 +1,254 @@
+# Kernels de física compilados con Numba. Trabajan sobre los arrays SoA de
+# World (float32) y son intercambiables con los de physics.pyx.
+
+import numpy as np
+from numba import float32, get_num_threads, int64, njit, prange, void
+
+# Interfaz común de los dos backends (main.py importa exactamente esto)
+__all__ = ["get_num_threads", "step_integrate", "resolve_edges", "resolve_pairs", "wake_slow"]
+
+_REAL = np.float32
+
+# Constantes en float32 para que la aritmética de los kernels no se promueva a float64
+_K_SLOP = _REAL(0.01)  # margen de corrección ampliado para absorber el redondeo de float32
+_SNAP_MARGIN = _REAL(0.1)
+_WAKE_SPEED_SQ = _REAL(12.0 * 12.0)
+_WAKE_PUSH = _REAL(16.0)
+_ZERO = _REAL(0.0)
+_ONE = _REAL(1.0)
+_TWO = _REAL(2.0)
+
+# Tipos de las firmas: arrays [N,2] y columnas [N] contiguos en float32
+_VEC2 = float32[:, ::1]
+_COL = float32[::1]
+
+
+@njit(void(_VEC2, _VEC2, float32, float32, float32, float32),
+      fastmath=True, cache=True, boundscheck=False)
+def step_integrate(pos, vel, gdx, gdy, damp, dt):
+    # gd = g_efectiva*dt y damp ya vienen precalculados para el paso fijo
+    for i in range(pos.shape[0]):
+        vx = (vel[i, 0] + gdx) * damp
+        vy = (vel[i, 1] + gdy) * damp
+        vel[i, 0] = vx
+        vel[i, 1] = vy
+        pos[i, 0] += vx * dt
+        pos[i, 1] += vy * dt
+
+
+@njit(void(_VEC2, _VEC2, _COL, _COL, _COL, _COL, _COL, _COL, _COL, _COL,
+           float32, float32, float32, float32),
+      fastmath=True, cache=True, boundscheck=False)
+def resolve_edges(pos, vel, radii, p1x, p1y, etx, ety, enx, eny, elen, wvx, wvy, rest, fric):
+    # Colisión pared-bola (pared moviéndose con velocidad wv) + snap inside.
+    # Invariantes de la llamada fuera de los bucles; el estado de cada pelota
+    # vive en locales y se escribe una sola vez al final.
+    keep_t = max(_ZERO, _ONE - fric)
+    n_edges = elen.shape[0]
+    for i in range(pos.shape[0]):
+        r = radii[i]
+        r_sq = r * r
+        cx = pos[i, 0]
+        cy = pos[i, 1]
+        vx = vel[i, 0]
+        vy = vel[i, 1]
+        # El snap sólo hace falta si alguna arista movió la pelota o si el
+        # centro ya estaba fuera de alguna (si no, la posición no cambió y
+        # todas las distancias con signo son >= 0)
+        dirty = False
+        for k in range(n_edges):
+            ax = p1x[k]
+            ay = p1y[k]
+            tx = etx[k]
+            ty = ety[k]
+            nx = enx[k]
+            ny = eny[k]
+            L = elen[k]
+            dx = cx - ax
+            dy = cy - ay
+            s = nx * dx + ny * dy
+            if s < 0.0:
+                dirty = True
+            u = tx * dx + ty * dy
+            if u < _ZERO:
+                u = _ZERO
+            elif u > L:
+                u = L
+            if 0.0 < u < L:
+                if s >= r:
+                    continue
+                penetration = r - s
+            else:
+                cqx = cx - (ax + tx * u)
+                cqy = cy - (ay + ty * u)
+                dist_sq = cqx * cqx + cqy * cqy
+                if dist_sq >= r_sq:
+                    continue
+                dist = np.sqrt(dist_sq)
+                if dist > 1e-8:
+                    nx = cqx / dist
+                    ny = cqy / dist
+                penetration = r - dist
+
+            v_wall_n = wvx * nx + wvy * ny
+            vn = vx * nx + vy * ny
+            vn_rel = vn - v_wall_n
+            if vn_rel < 0.0:
+                new_vn = -rest * vn_rel + v_wall_n
+                vx = nx * new_vn + (vx - nx * vn) * keep_t
+                vy = ny * new_vn + (vy - ny * vn) * keep_t
+
+            push = max(_ZERO, penetration + _K_SLOP)
+            cx += nx * push
+            cy += ny * push
+            dirty = True
+
+        if dirty:
+            for k in range(n_edges):
+                nx = enx[k]
+                ny = eny[k]
+                s = nx * (cx - p1x[k]) + ny * (cy - p1y[k])
+                if s < 0.0:
+                    cx += nx * (_SNAP_MARGIN - s)
+                    cy += ny * (_SNAP_MARGIN - s)
+        pos[i, 0] = cx
+        pos[i, 1] = cy
+        vel[i, 0] = vx
+        vel[i, 1] = vy
+
+
+# Pelotas mínimas por bloque paralelo: con pocas pelotas no compensa repartir
+_BALLS_PER_CHUNK = 64
+
+# Mezcla del índice de par para elegir dirección de jitter sin contador compartido
+_JITTER_MIX = 97
+
+# Celda propia + 4 vecinas "hacia delante": cada par de celdas se visita una vez
+_FORWARD_CELLS = ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1))
+
+
+@njit(fastmath=True, cache=True, boundscheck=False)
+def _build_grid(pos, cell):
+    # Rejilla uniforme por counting sort: las pelotas de la celda c son
+    # order[start[c]:start[c + 1]]
+    N = pos.shape[0]
+    xmin = pos[0, 0]
+    ymin = pos[0, 1]
+    for i in range(1, N):
+        xmin = min(xmin, pos[i, 0])
+        ymin = min(ymin, pos[i, 1])
+    cell_x = np.empty(N, dtype=np.int64)
+    cell_y = np.empty(N, dtype=np.int64)
+    gw = 1
+    gh = 1
+    for i in range(N):
+        cell_x[i] = int((pos[i, 0] - xmin) / cell)
+        cell_y[i] = int((pos[i, 1] - ymin) / cell)
+        gw = max(gw, cell_x[i] + 1)
+        gh = max(gh, cell_y[i] + 1)
+
+    start = np.zeros(gw * gh + 1, dtype=np.int64)
+    for i in range(N):
+        start[cell_y[i] * gw + cell_x[i] + 1] += 1
+    for c in range(gw * gh):
+        start[c + 1] += start[c]
+    fill = start[:-1].copy()
+    order = np.empty(N, dtype=np.int64)
+    for i in range(N):
+        c = cell_y[i] * gw + cell_x[i]
+        order[fill[c]] = i
+        fill[c] += 1
+    return cell_x, cell_y, gw, gh, start, order
+
+
+@njit(fastmath=True, cache=True, boundscheck=False)
+def _collide_pair(pos, vel, radii, rest, jitter, jitter_idx, i, j, dpos, dvel):
+    nx = pos[j, 0] - pos[i, 0]
+    ny = pos[j, 1] - pos[i, 1]
+    dist_sq = nx * nx + ny * ny
+    rsum = radii[i] + radii[j]
+    if dist_sq >= rsum * rsum:
+        return
+    if dist_sq <= 1e-16:
+        # Centros coincidentes: dirección de la tabla de jitter (tamaño 2^k)
+        d = (jitter_idx + i * _JITTER_MIX + j) & (jitter.shape[0] - 1)
+        nx = jitter[d, 0]
+        ny = jitter[d, 1]
+        dist = _ONE
+    else:
+        dist = np.sqrt(dist_sq)
+        nx /= dist
+        ny /= dist
+
+    overlap = rsum - dist
+    if overlap <= 0.0:
+        return
+
+    inv_ma = _ONE / max(_ONE, radii[i] * radii[i])
+    inv_mb = _ONE / max(_ONE, radii[j] * radii[j])
+    total_inv = inv_ma + inv_mb
+    corr = overlap / total_inv
+    dpos[i, 0] -= nx * corr * inv_ma
+    dpos[i, 1] -= ny * corr * inv_ma
+    dpos[j, 0] += nx * corr * inv_mb
+    dpos[j, 1] += ny * corr * inv_mb
+
+    vel_n = (vel[j, 0] - vel[i, 0]) * nx + (vel[j, 1] - vel[i, 1]) * ny
+    if vel_n > 0.0:
+        return
+    jn = -(_ONE + rest) * vel_n / total_inv
+    dvel[i, 0] -= nx * jn * inv_ma
+    dvel[i, 1] -= ny * jn * inv_ma
+    dvel[j, 0] += nx * jn * inv_mb
+    dvel[j, 1] += ny * jn * inv_mb
+
+
+@njit(void(_VEC2, _VEC2, _COL, float32, _VEC2, int64, int64),
+      parallel=True, fastmath=True, cache=True, boundscheck=False)
+def resolve_pairs(pos, vel, radii, rest, jitter, jitter_idx, n_threads):
+    # Fase amplia con rejilla de celda 2*r_max: sólo se prueban pares en la
+    # misma celda o en celdas vecinas. Cada bloque de pelotas escribe en sus
+    # propios acumuladores dpos/dvel, que se suman al final (sin carreras).
+    N = pos.shape[0]
+    if N < 2:
+        return
+    cell = _TWO * radii.max()
+    cell_x, cell_y, gw, gh, start, order = _build_grid(pos, cell)
+
+    n_chunks = min(n_threads, (N + _BALLS_PER_CHUNK - 1) // _BALLS_PER_CHUNK)
+    chunk = (N + n_chunks - 1) // n_chunks
+    dpos = np.zeros((n_chunks, N, 2), dtype=np.float32)
+    dvel = np.zeros((n_chunks, N, 2), dtype=np.float32)
+    for c in prange(n_chunks):
+        for i in range(c * chunk, min(N, (c + 1) * chunk)):
+            for dx, dy in _FORWARD_CELLS:
+                cx = cell_x[i] + dx
+                cy = cell_y[i] + dy
+                if cx >= gw or cy < 0 or cy >= gh:
+                    continue
+                cid = cy * gw + cx
+                for s in range(start[cid], start[cid + 1]):
+                    j = order[s]
+                    if dx == 0 and dy == 0 and j <= i:
+                        continue
+                    _collide_pair(pos, vel, radii, rest, jitter, jitter_idx, i, j, dpos[c], dvel[c])
+
+    for c in range(n_chunks):
+        pos += dpos[c]
+        vel += dvel[c]
+
+
+@njit(void(_VEC2, _VEC2, float32, float32), fastmath=True, cache=True, boundscheck=False)
+def wake_slow(pos, vel, cx, cy):
+    # Evitar dormir totalmente: empujón hacia el centro a las pelotas lentas
+    for i in range(pos.shape[0]):
+        vx = vel[i, 0]
+        vy = vel[i, 1]
+        if vx * vx + vy * vy < _WAKE_SPEED_SQ:
+            dx = cx - pos[i, 0]
+            dy = cy - pos[i, 1]
+            d_sq = dx * dx + dy * dy
+            if d_sq > 1e-16:
+                k = _WAKE_PUSH / np.sqrt(d_sq)
+                vel[i, 0] += dx * k
+                vel[i, 1] += dy * k
@@ -0,0 +1,114 @@
+# Render de las pelotas en GPU con moderngl: todas se dibujan en una sola
+# llamada como point sprites. El fondo, el hexágono y el texto se siguen
+# dibujando con pygame en una superficie "overlay" que se sube como textura.
+
+import moderngl
+import numpy as np
+import pygame
+
+_QUAD_VS = """
+#version 330
+in vec2 in_vert;
+in vec2 in_uv;
+out vec2 v_uv;
+void main() {
+    v_uv = in_uv;
+    gl_Position = vec4(in_vert, 0.0, 1.0);
+}
+"""
+
+_QUAD_FS = """
+#version 330
+uniform sampler2D u_overlay;
+in vec2 v_uv;
+out vec4 f_color;
+void main() {
+    f_color = texture(u_overlay, v_uv);
+}
+"""
+
+_BALL_VS = """
+#version 330
+uniform vec2 u_screen;
+in vec2 in_pos;
+in float in_radius;
+in vec3 in_color;
+out vec3 v_color;
+void main() {
+    vec2 ndc = in_pos / u_screen * 2.0 - 1.0;
+    gl_Position = vec4(ndc.x, -ndc.y, 0.0, 1.0);  // y de pantalla hacia abajo
+    gl_PointSize = 2.0 * in_radius;
+    v_color = in_color;
+}
+"""
+
+_BALL_FS = """
+#version 330
+in vec3 v_color;
+out vec4 f_color;
+void main() {
+    // Disco dentro del sprite cuadrado, con borde suavizado
+    float r = length(gl_PointCoord * 2.0 - 1.0);
+    float aa = fwidth(r);
+    float alpha = 1.0 - smoothstep(1.0 - aa, 1.0, r);
+    if (alpha <= 0.0)
+        discard;
+    f_color = vec4(v_color, alpha);
+}
+"""
+
+# pos(2) + radio(1) + color(3), float32 intercalados
+_BALL_FORMAT = "2f 1f 3f"
+_BALL_STRIDE = 6 * 4
+
+
+class GLRenderer:
+    # Requiere una ventana creada con pygame.OPENGL | pygame.DOUBLEBUF
+    def __init__(self, width: int, height: int):
+        self.ctx = moderngl.create_context()
+        self.ctx.enable(moderngl.BLEND | moderngl.PROGRAM_POINT_SIZE)
+        self.size = (width, height)
+
+        # Overlay: pygame dibuja aquí lo que no son pelotas
+        self.overlay = pygame.Surface((width, height))
+        self._overlay_tex = self.ctx.texture((width, height), 3, alignment=1)
+        quad_prog = self.ctx.program(vertex_shader=_QUAD_VS, fragment_shader=_QUAD_FS)
+        quad = np.array([-1.0, -1.0, 0.0, 0.0,
+                         1.0, -1.0, 1.0, 0.0,
+                         -1.0, 1.0, 0.0, 1.0,
+                         1.0, 1.0, 1.0, 1.0], dtype="f4")
+        self._quad_vbo = self.ctx.buffer(quad.tobytes())
+        self._quad_vao = self.ctx.vertex_array(quad_prog, [(self._quad_vbo, "2f 2f", "in_vert", "in_uv")])
+        # Vértices del hexágono con los que se subió el overlay por última vez
+        self._overlay_verts = None
+
+        self._ball_prog = self.ctx.program(vertex_shader=_BALL_VS, fragment_shader=_BALL_FS)
+        self._ball_prog["u_screen"].value = (float(width), float(height))
+        self._ball_vbo = self.ctx.buffer(reserve=_BALL_STRIDE)
+        self._ball_vao = self.ctx.vertex_array(
+            self._ball_prog, [(self._ball_vbo, _BALL_FORMAT, "in_pos", "in_radius", "in_color")])
+        self._colors = np.zeros((0, 3), dtype="f4")
+
+    def overlay_dirty(self, world) -> bool:
+        # El overlay sólo cambia cuando el hexágono se mueve (shake)
+        return world.verts != self._overlay_verts
+
+    def draw(self, world):
+        self.ctx.viewport = (0, 0) + self.size
+        if self.overlay_dirty(world):
+            self._overlay_tex.write(pygame.image.tobytes(self.overlay, "RGB", True))
+            self._overlay_verts = world.verts
+        self._overlay_tex.use(0)
+        self._quad_vao.render(moderngl.TRIANGLE_STRIP)
+
+        n = len(world.radius)
+        if n == 0:
+            return
+        if len(self._colors) != n:
+            # Los colores sólo cambian al crear pelotas
+            self._colors = np.asarray(world.colors, dtype="f4") / 255.0
+        data = np.hstack([world.pos, world.radius[:, None], self._colors]).astype("f4")
+        if self._ball_vbo.size != data.nbytes:
+            self._ball_vbo.orphan(data.nbytes)
+        self._ball_vbo.write(data.tobytes())
+        self._ball_vao.render(moderngl.POINTS, vertices=n)